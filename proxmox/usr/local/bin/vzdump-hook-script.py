@@ -35,17 +35,21 @@ This TASK_ID can be used to grab the full job log from `/var/log/pve/tasks/{ALPH
 ALPHANUM is determined by the last character of the `starttime`.
 """
 
+from __future__ import annotations
+
 import os
 import sys
 import json
 import re
+import socket
+import fcntl
+import functools
 import subprocess
 import shutil
-import tempfile
-import requests
-import argparse
-from pathlib import Path
-from typing import Optional, Dict, List, Tuple, Any, Union
+import threading
+import http.client
+import urllib.error
+import urllib.parse
 
 # Default configuration
 DEFAULT_HC_BASE_DOMAIN = "https://healthchecks.mydomain.com"
@@ -54,28 +58,41 @@ DEFAULT_HC_RW_API_KEY = "eJy4I0V41OJ7jM1tQy5gjtBgyJ9mz1Kd"
 DEFAULT_HC_PING_KEY = "oiB2qNQV2uGsYSxQAo3rxA"
 DEFAULT_ERROR_CODE = 666
 ENV_FILE = "/etc/pve/healthchecks/variables.env"
+COROSYNC_CONF = "/etc/pve/corosync.conf"
+
+# Modification time of each environment file already loaded
+LOADED_ENV_FILES = {}
 
 # Load environment variables from file
 def load_env_file(file_path=ENV_FILE):
     """Load environment variables from a file."""
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r') as file:
-                for line in file:
-                    # Skip comments and empty lines
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    # Parse key=value pairs
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        # Remove quotes if present
-                        value = value.strip('\'"')
-                        os.environ[key] = value
+    try:
+        # Skip files that have not changed since they were last loaded
+        mtime = os.stat(file_path).st_mtime
+        if LOADED_ENV_FILES.get(file_path) == mtime:
             return True
-        except Exception as e:
-            print(f"Error loading environment file {file_path}: {e}", file=sys.stderr)
+        
+        env = {}
+        with open(file_path, 'r') as file:
+            for line in file:
+                # Skip comments and empty lines
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                
+                # Parse key=value pairs
+                key, sep, value = line.partition('=')
+                if sep:
+                    # Remove quotes if present
+                    env[key] = value.strip('\'"')
+        
+        os.environ.update(env)
+        LOADED_ENV_FILES[file_path] = mtime
+        return True
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading environment file {file_path}: {e}", file=sys.stderr)
     return False
 
 # Load environment variables from the file
@@ -89,6 +106,8 @@ HC_PING_KEY = os.environ.get("HC_PING_KEY", DEFAULT_HC_PING_KEY)
 
 # Command line arguments - these would override environment variables
 def parse_args():
+    import argparse
+    
     parser = argparse.ArgumentParser(description="Proxmox Backup Hook Script with Healthchecks.io integration")
     
     # Arguments for backup phases - these are positional for compatibility
@@ -111,46 +130,50 @@ def parse_args():
     args = parser.parse_args()
     return args
 
-# Parse command line arguments
-args = parse_args()
-
-# Override environment variables with command line arguments if provided
-if args.env_file and args.env_file != ENV_FILE:
-    load_env_file(args.env_file)
-
-HC_BASE_DOMAIN = args.hc_domain or HC_BASE_DOMAIN
-HC_PING_DOMAIN = args.hc_ping_domain or HC_PING_DOMAIN
-HC_RW_API_KEY = args.hc_rw_key or HC_RW_API_KEY
-HC_PING_KEY = args.hc_ping_key or HC_PING_KEY
-
 # Get task ID
+@functools.lru_cache(maxsize=None)
 def get_task_id() -> str:
     """Get the task ID from the parent process."""
     try:
         ppid = os.getppid()
-        cmd = f"ps -o args= {ppid}"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        cmd = ["ps", "-o", "args=", str(ppid)]
+        result = subprocess.run(cmd, capture_output=True, text=True)
         return result.stdout.strip()
     except Exception as e:
         error("Get Task ID", str(e))
         return "unknown-task"
 
 TASK_ID = get_task_id()
-print(f"HOOK: {' '.join(sys.argv[1:])} -- {TASK_ID}")
 
 # Create error log file
-ERRLOG = Path(tempfile.gettempdir()) / f"{TASK_ID}.errlog"
+ERRLOG = os.path.join(os.environ.get("TMPDIR") or "/tmp", f"{TASK_ID}.errlog")
+
+# Concurrent hook invocations share ERRLOG, so access it under flock
+def append_errlog(text: str) -> None:
+    """Append a line to the error log file under an exclusive lock."""
+    with open(ERRLOG, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(f"{text}\n")
+
+def read_errlog() -> str:
+    """Read the error log file under a shared lock."""
+    with open(ERRLOG, "r") as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        return f.read()
 
 # Utility functions
+# Serializes log lines, which backup-start prints from several threads
+PRINT_LOCK = threading.Lock()
+
 def error(task: str, msg: str = "", exit_code: int = DEFAULT_ERROR_CODE) -> None:
     """Log an error and exit the script."""
     error_msg = f"FATAL: '{task}' failed with exit code {exit_code}."
     if msg:
         error_msg += f"\nCONTEXT: {msg}"
     
-    print(error_msg, file=sys.stderr)
-    with open(ERRLOG, "a") as f:
-        f.write(f"{error_msg}\n")
+    with PRINT_LOCK:
+        print(error_msg, file=sys.stderr)
+    append_errlog(error_msg)
     
     sys.exit(exit_code)
 
@@ -160,78 +183,65 @@ def warn(task: str, msg: str = "") -> None:
     if msg:
         warn_msg += f"\nCONTEXT: {msg}"
     
-    print(warn_msg, file=sys.stderr)
-    with open(ERRLOG, "a") as f:
-        f.write(f"{warn_msg}\n")
+    with PRINT_LOCK:
+        print(warn_msg, file=sys.stderr)
+    append_errlog(warn_msg)
 
 def info(msg: str) -> None:
     """Log information."""
-    import inspect
-    caller = inspect.getframeinfo(inspect.currentframe().f_back)
-    print(f"MESG: '{caller.function}:{caller.lineno}' {msg}")
+    caller = sys._getframe(1)
+    with PRINT_LOCK:
+        print(f"MESG: '{caller.f_code.co_name}:{caller.f_lineno}' {msg}")
 
-def get_cluster_info() -> Tuple[str, str]:
+@functools.lru_cache(maxsize=None)
+def get_cluster_info() -> tuple[str, str]:
     """Get information about cluster and node."""
+    # Determine if we are in a cluster from the corosync configuration
+    cluster = "standalone"
     try:
-        cmd = "pvesh get /cluster/status --output-format json"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        if result.returncode != 0:
-            error("Get Cluster Info", f"Failed to execute pvesh: {result.stderr}")
-        
-        data = json.loads(result.stdout)
-        
-        # Determine if we are in a cluster
-        cluster = "standalone"
-        for item in data:
-            if item.get("type") == "cluster":
-                cluster = item.get("name", "unknown-cluster")
-                break
-        
-        # Find local node
-        node = None
-        for item in data:
-            if item.get("type") == "node" and item.get("local") == 1:
-                node = item.get("name")
-                break
-        
-        if not node:
-            cmd = "hostname"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            node = result.stdout.strip()
-        
-        return cluster, node
-    
+        with open(COROSYNC_CONF, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("cluster_name:"):
+                    cluster = line.split(":", 1)[1].strip() or "unknown-cluster"
+                    break
+    except FileNotFoundError:
+        pass
     except Exception as e:
         error("Get Cluster Info", str(e))
-        return "unknown-cluster", "unknown-node"
-
-# Get cluster and node information
-CLUSTER, NODE = get_cluster_info()
+    
+    # The Proxmox node name is the short hostname
+    node = socket.gethostname().split(".")[0]
+    
+    return cluster, node
 
 # Define slug variables
+@functools.lru_cache(maxsize=None)
 def get_domain() -> str:
     """Get the host domain."""
     try:
-        cmd = "hostname --domain"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        cmd = ["hostname", "--domain"]
+        result = subprocess.run(cmd, capture_output=True, text=True)
         return result.stdout.strip()
     except Exception:
         return "local"
 
-HC_SLUG_SUFFIX = f"{NODE.lower()}.{CLUSTER.lower()}.{get_domain().lower()}"
-HC_HOST_SLUG_PREFIX = "job"
+@functools.lru_cache(maxsize=None)
+def get_slug_suffix() -> str:
+    """Get the slug suffix identifying this node."""
+    cluster, node = get_cluster_info()
+    return f"{node.lower()}.{cluster.lower()}.{get_domain().lower()}"
 
-# Process command line arguments
-PHASE = args.phase
-if not PHASE:
-    error("Arguments", "Phase not provided")
+HC_HOST_SLUG_PREFIX = "job"
 
-MODE = args.mode
-VMID = args.vmid
+# Command line arguments, set by main()
+PHASE = ""
+MODE = ""
+VMID = ""
 
 # Environment variables
 VMTYPE = os.environ.get("VMTYPE", "unknown")
-HC_VM_SLUG_PREFIX = f"{VMID}-{VMTYPE}"
+HC_VM_SLUG_PREFIX = ""
 
 # DUMPDIR is set for local backups, STOREID for Proxmox Backup Server
 STORAGE = os.environ.get("DUMPDIR", os.environ.get("STOREID", ""))
@@ -242,36 +252,118 @@ def get_logfile() -> str:
     fallback = f"/var/log/vzdump/{VMTYPE.lower()}-{VMID}.log"
     return os.environ.get("LOGFILE", fallback)
 
-LOGFILE = get_logfile()
+LOGFILE = ""
 
 # Function to normalize a slug
+SLUG_RE = re.compile(r"[^a-zA-Z0-9_-]")
+# Spaces become double underscores, periods become hyphens, anything else an underscore
+SLUG_REPLACEMENTS = {" ": "__", ".": "-"}
+
 def slugify(text: str, suffix: str = "") -> str:
     """Normalize text to create a slug."""
     if suffix:
         text = f"{text} {suffix}"
     
-    # Replace spaces with double underscores
-    text = text.replace(" ", "__")
+    # Keep only alphanumeric characters, hyphens and underscores
+    return SLUG_RE.sub(lambda m: SLUG_REPLACEMENTS.get(m.group(), "_"), text)
+
+# Shared HTTP connections, one per Healthchecks host and thread. Calls made
+# concurrently (backup-start) each open their own connection and handshake.
+@functools.lru_cache(maxsize=None)
+def get_connection(scheme: str, netloc: str, thread_id: int) -> http.client.HTTPConnection:
+    """Get a persistent connection to a Healthchecks host for the given thread."""
+    if scheme == "https":
+        return http.client.HTTPSConnection(netloc, timeout=10)
+    return http.client.HTTPConnection(netloc, timeout=10)
+
+def get_proxy(parts: urllib.parse.SplitResult) -> str | None:
+    """Get the proxy URL to use for a request, if any, following the *_proxy variables."""
+    if not any(key.lower().endswith("_proxy") for key in os.environ):
+        return None
     
-    # Replace periods with hyphens
-    text = text.replace(".", "-")
+    from urllib import request as urllib_request
     
-    # Keep only alphanumeric characters, hyphens and underscores
-    text = re.sub(r"[^a-zA-Z0-9_-]", "_", text)
+    proxies = urllib_request.getproxies()
+    proxy = proxies.get(parts.scheme) or proxies.get("all")
+    if not proxy or urllib_request.proxy_bypass(parts.hostname):
+        return None
     
-    return text
+    return proxy
+
+def proxy_request(method: str, url: str, proxy: str, data: bytes | None,
+                  headers: dict[str, str]) -> tuple[int, str, http.client.HTTPMessage, bytes]:
+    """Send an HTTP request through a proxy, without following redirects."""
+    from urllib import request as urllib_request
+    
+    # Return redirects to http_request() instead of following them
+    class NoRedirectHandler(urllib_request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+    
+    opener = urllib_request.build_opener(
+        urllib_request.ProxyHandler({urllib.parse.urlsplit(url).scheme: proxy}),
+        NoRedirectHandler()
+    )
+    request = urllib_request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with opener.open(request, timeout=10) as response:
+            return response.status, response.reason, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.reason, e.headers, e.read()
+
+def direct_request(method: str, parts: urllib.parse.SplitResult, data: bytes | None,
+                   headers: dict[str, str]) -> tuple[int, str, http.client.HTTPMessage, bytes]:
+    """Send an HTTP request over a shared connection, without following redirects."""
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
+    
+    conn = get_connection(parts.scheme, parts.netloc, threading.get_ident())
+    for attempt in range(2):
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.reason, response.headers, response.read()
+        except ConnectionError:
+            # The server closed the keep-alive connection, reconnect once
+            conn.close()
+            if attempt:
+                raise
+
+def http_request(method: str, url: str, data: bytes | None = None,
+                 headers: dict[str, str] | None = None, redirects: int = 5) -> bytes:
+    """Send an HTTP request and return the response body."""
+    parts = urllib.parse.urlsplit(url)
+    
+    # http.client cannot go through a proxy, let urllib handle proxied hosts
+    proxy = get_proxy(parts)
+    if proxy:
+        status, reason, response_headers, body = proxy_request(method, url, proxy, data, headers or {})
+    else:
+        status, reason, response_headers, body = direct_request(method, parts, data, headers or {})
+    
+    # Follow redirects (e.g. http to https) the same way with or without a proxy:
+    # 303 switches to a body-less GET, other redirects keep the method and body
+    location = response_headers.get("Location")
+    if 300 <= status < 400 and location and redirects > 0:
+        if status == 303:
+            method, data = "GET", None
+        return http_request(method, urllib.parse.urljoin(url, location), data, headers, redirects - 1)
+    
+    if not 200 <= status < 300:
+        raise urllib.error.HTTPError(url, status, reason, response_headers, None)
+    
+    return body
 
 # Function to get the dashboard URL from a slug
 def get_dashboard_url(slug: str, apikey: str, base_url: str = "https://healthchecks.io") -> str:
     """Get the dashboard URL from a slug."""
-    slug = slugify(slug, HC_SLUG_SUFFIX)
+    slug = slugify(slug, get_slug_suffix())
     url = f"{base_url}/api/v3/checks/?slug={slug}"
     
     try:
         headers = {"X-Api-Key": apikey}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = json.loads(http_request("GET", url, headers=headers))
         
         # Extract ping URL and convert to dashboard URL
         ping_url = data["checks"][0]["ping_url"]
@@ -283,8 +375,17 @@ def get_dashboard_url(slug: str, apikey: str, base_url: str = "https://healthche
         error("Get Dashboard URL", str(e))
         return ""
 
+# Function to read a Proxmox description
+def read_hash_comments(filepath: str) -> str:
+    """Read the '#' comment lines of a Proxmox config file, without the leading '#'."""
+    try:
+        with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+            return "\n".join(l[1:].rstrip() for l in f if l.startswith("#")).strip()
+    except OSError:
+        return ""
+
 # Functions to create tags
-def add_tag(key: str, value: str) -> Optional[str]:
+def add_tag(key: str, value: str) -> str | None:
     """Create a tag in the format key=value."""
     if not key:
         error("Key Validation", "Empty key")
@@ -301,8 +402,10 @@ def add_tag(key: str, value: str) -> Optional[str]:
     
     return None
 
-def add_tag_from_file(filepath: str, key: str = "") -> Optional[str]:
+def add_tag_from_file(filepath: str, key: str = "") -> str | None:
     """Create a tag from a file's content."""
+    from pathlib import Path
+    
     file_path = Path(filepath)
     
     if not file_path.exists():
@@ -323,7 +426,7 @@ def add_tag_from_file(filepath: str, key: str = "") -> Optional[str]:
     value = file_path.read_text().strip()
     return add_tag(key.replace(" ", "_"), value)
 
-def add_tag_from_cmd(key: str, *cmd_args) -> Optional[str]:
+def add_tag_from_cmd(key: str, *cmd_args) -> str | None:
     """Create a tag from a command's output."""
     cmd = cmd_args[0]
     if not shutil.which(cmd):
@@ -340,8 +443,11 @@ def add_tag_from_cmd(key: str, *cmd_args) -> Optional[str]:
 # Fonction pour créer ou mettre à jour un endpoint Healthchecks
 def hc_create(name: str, slug_prefix: str, grace: int = 3600, description: str = "", 
               tags: str = "", channels: str = "*", timeout: int = 86400, 
-              apikey: str = HC_RW_API_KEY, url: str = HC_BASE_DOMAIN) -> None:
+              apikey: str = "", url: str = "") -> None:
     """Crée ou met à jour un endpoint Healthchecks."""
+    apikey = apikey or HC_RW_API_KEY
+    url = url or HC_BASE_DOMAIN
+    
     if not name:
         error("HC Create", "Name parameter is required")
     
@@ -352,12 +458,12 @@ def hc_create(name: str, slug_prefix: str, grace: int = 3600, description: str =
         error("HC Create", "API key is required")
     
     # Construire le slug complet
-    slug = slugify(slug_prefix, HC_SLUG_SUFFIX)
+    slug = slugify(slug_prefix, get_slug_suffix())
     
     # Récupérer le fuseau horaire
     try:
-        tz_cmd = "timedatectl show --property Timezone | cut -d '=' -f2"
-        tz_result = subprocess.run(tz_cmd, shell=True, capture_output=True, text=True, check=True)
+        tz_cmd = ["timedatectl", "show", "--property", "Timezone", "--value"]
+        tz_result = subprocess.run(tz_cmd, capture_output=True, text=True, check=True)
         timezone = tz_result.stdout.strip()
     except Exception:
         timezone = "UTC"
@@ -383,19 +489,22 @@ def hc_create(name: str, slug_prefix: str, grace: int = 3600, description: str =
     api_url = f"{url}/api/v3/checks/"
     
     try:
-        headers = {"X-Api-Key": apikey}
-        response = requests.post(api_url, headers=headers, json=payload, timeout=10)
-        response.raise_for_status()
+        headers = {"Content-Type": "application/json", "X-Api-Key": apikey}
+        data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        response = http_request("POST", api_url, data=data, headers=headers)
         
         # Vérifier que la réponse est un JSON valide
-        response.json()
-    except requests.exceptions.RequestException as e:
+        json.loads(response)
+    except (OSError, ValueError, http.client.HTTPException) as e:
         error("Healthcheck Creation", str(e))
 
 # Fonction pour envoyer un ping à un endpoint Healthchecks
 def hc_ping(slug_prefix: str, report: str = "", file: str = "", data: str = "",
-            pingkey: str = HC_PING_KEY, url: str = HC_PING_DOMAIN) -> None:
+            pingkey: str = "", url: str = "") -> None:
     """Envoie un ping à un endpoint Healthchecks."""
+    pingkey = pingkey or HC_PING_KEY
+    url = url or HC_PING_DOMAIN
+    
     if not slug_prefix:
         error("HC Ping", "Slug prefix parameter is required")
     
@@ -412,7 +521,7 @@ def hc_ping(slug_prefix: str, report: str = "", file: str = "", data: str = "",
         error("HC Ping", "File and Data arguments are mutually exclusive")
     
     # Construire le slug complet
-    slug = slugify(slug_prefix, HC_SLUG_SUFFIX)
+    slug = slugify(slug_prefix, get_slug_suffix())
     
     # Construire l'URL complet
     ping_url = f"{url}/{pingkey}/{slug}"
@@ -423,6 +532,8 @@ def hc_ping(slug_prefix: str, report: str = "", file: str = "", data: str = "",
     
     # Récupérer les données du fichier si nécessaire
     if file:
+        from pathlib import Path
+        
         file_path = Path(file)
         if not file_path.exists():
             error("Check file exists", f"File {file} not found")
@@ -434,137 +545,79 @@ def hc_ping(slug_prefix: str, report: str = "", file: str = "", data: str = "",
             error("Check file permissions", f"Cannot read {file}")
         
         try:
-            with open(file, "r") as f:
-                # Lire les derniers 100000 octets
-                f.seek(0, os.SEEK_END)
-                size = f.tell()
+            # Lire les derniers 100000 octets en mode binaire
+            size = os.path.getsize(file)
+            with open(file, "rb") as f:
                 f.seek(max(0, size - 100000), os.SEEK_SET)
-                data = f.read()
+                data = f.read().decode("utf-8", "replace")
         except Exception as e:
             error("Read Log File", str(e))
     
     # Envoyer le ping
     try:
-        response = requests.post(ping_url, data=data, timeout=10)
-        response.raise_for_status()
-        return response.url
-    except requests.exceptions.RequestException as e:
+        http_request("POST", ping_url, data=data.encode())
+        return ping_url
+    except (OSError, http.client.HTTPException) as e:
         error(f"Healthcheck Ping w/Data ({report or 'success'})", str(e))
 
-# Vérifier que jq est installé
-def check_jq_installed() -> None:
-    """Vérifie que jq est installé et l'installe si nécessaire."""
-    if not shutil.which("jq"):
-        info("JQ could not be found, installing")
-        
-        if shutil.which("apt"):
-            try:
-                subprocess.run(["apt", "install", "-y", "jq"], check=True)
-            except subprocess.CalledProcessError:
-                error("Installing jq", "apt install failed")
-        
-        elif shutil.which("dnf"):
-            try:
-                subprocess.run(["dnf", "install", "-y", "jq"], check=True)
-            except subprocess.CalledProcessError:
-                error("Installing jq", "dnf install failed")
-        
-        else:
-            error("Installing jq", "Unknown package manager")
-
-# Exécuter les actions en fonction de la phase
-def main() -> None:
-    """Main function that executes actions based on the phase."""
-    # Display configuration parameters for debugging
-    info(f"Configuration: HC_BASE_DOMAIN={HC_BASE_DOMAIN}, HC_PING_DOMAIN={HC_PING_DOMAIN}")
-    info(f"Using API Key={HC_RW_API_KEY[:4]}***{HC_RW_API_KEY[-4:]} and Ping Key={HC_PING_KEY[:4]}***{HC_PING_KEY[-4:]}")
-    
-    check_jq_installed()
-    
-    if PHASE == "job-init":
-        # Create the Healthchecks endpoint for the host
-        tags = ""
-        
-        # For host, add cluster and kernel tags
-        cluster_tag = add_tag("cluster", CLUSTER)
-        if cluster_tag:
-            tags += cluster_tag
-            
-        # Add kernel tag using the uname command
-        try:
-            kernel_cmd = "uname --kernel-release"
-            kernel_result = subprocess.run(kernel_cmd, shell=True, capture_output=True, text=True)
-            kernel_version = kernel_result.stdout.strip()
-            kernel_tag = add_tag("kernel", kernel_version)
-            if kernel_tag:
-                tags += kernel_tag
-        except Exception as e:
-            warn("Kernel tag", str(e))
-
-        # Get node description
-        try:
-            cmd = "grep '^#' /etc/pve/local/config | sed 's/^#//'"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            node_description = result.stdout.strip()
-        except Exception:
-            node_description = ""
-        
-        info(f"{PHASE} -- Create {os.environ.get('HOSTNAME', 'unknown')} Endpoint")
+# Actions for each phase
+def job_init() -> None:
+    """Create the Healthchecks endpoint for the host."""
+    cluster, node = get_cluster_info()
+    
+    # For host, add cluster and kernel tags (kernel release as given by uname)
+    tags = "".join(filter(None, [
+        add_tag("cluster", cluster),
+        add_tag("kernel", os.uname().release)
+    ]))
+
+    # Get node description
+    node_description = read_hash_comments("/etc/pve/local/config")
+    
+    info(f"{PHASE} -- Create {os.environ.get('HOSTNAME', 'unknown')} Endpoint")
+    hc_create(
+        name=get_slug_suffix(),
+        slug_prefix=HC_HOST_SLUG_PREFIX,
+        grace=7200,
+        description=node_description,
+        tags=tags
+    )
+
+def job_start() -> None:
+    """Send a start ping to the host endpoint."""
+    info(f"{PHASE} -- Ping Host Start")
+    hc_ping(HC_HOST_SLUG_PREFIX, "start")
+
+def backup_start() -> None:
+    """Create and start the VM/container endpoint and log it on the host endpoint."""
+    cluster, node = get_cluster_info()
+    
+    # Add only cluster, node, storage, and vmtype tags for VM/container
+    tags = "".join(filter(None, [
+        add_tag("cluster", cluster),
+        add_tag("node", node),
+        add_tag("storage", STORAGE),
+        add_tag("vmtype", VMTYPE)
+    ]))
+    
+    # Get VM/container description
+    description = ""
+    if VMTYPE == "qemu":
+        description = read_hash_comments(f"/etc/pve/local/qemu-server/{VMID}.conf")
+    elif VMTYPE == "lxc":
+        description = read_hash_comments(f"/etc/pve/local/lxc/{VMID}.conf")
+    
+    info(f"{PHASE} -- Create {os.environ.get('HOSTNAME', 'unknown')} Endpoint")
+    
+    # Resolve the domain and slug suffix once, before the worker threads
+    # race on the (unlocked) lru_cache and run 'hostname --domain' twice
+    domain = get_domain()
+    get_slug_suffix()
+    
+    # Create endpoint for VM/container, then start it
+    def create_and_start() -> None:
         hc_create(
-            name=HC_SLUG_SUFFIX,
-            slug_prefix=HC_HOST_SLUG_PREFIX,
-            grace=7200,
-            description=node_description,
-            tags=tags
-        )
-    
-    elif PHASE == "job-start":
-        # Send a start ping to the host endpoint
-        info(f"{PHASE} -- Ping Host Start")
-        hc_ping(HC_HOST_SLUG_PREFIX, "start")
-    
-    elif PHASE == "backup-start":
-        # Create and start the Healthchecks endpoint for the VM/container
-        # and send a log ping to the host endpoint
-        tags = ""
-        
-        # Add only cluster, node, storage, and vmtype tags for VM/container
-        for tag_name, tag_value in [
-            ("cluster", CLUSTER),
-            ("node", NODE),
-            ("storage", STORAGE),
-            ("vmtype", VMTYPE)
-        ]:
-            tag = add_tag(tag_name, tag_value)
-            if tag:
-                tags += tag
-        
-        # Get VM/container description
-        description = ""
-        if VMTYPE == "qemu":
-            try:
-                cmd = f"grep '^#' /etc/pve/local/qemu-server/{VMID}.conf | sed 's/^#//'"
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                description = result.stdout.strip()
-            except Exception:
-                pass
-        elif VMTYPE == "lxc":
-            try:
-                cmd = f"grep '^#' /etc/pve/local/lxc/{VMID}.conf | sed 's/^#//'"
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                description = result.stdout.strip()
-            except Exception:
-                pass
-        
-        info(f"{PHASE} -- Create {os.environ.get('HOSTNAME', 'unknown')} Endpoint")
-        
-        # Create endpoint for VM/container
-        domain_cmd = "hostname --domain"
-        domain_result = subprocess.run(domain_cmd, shell=True, capture_output=True, text=True)
-        domain = domain_result.stdout.strip()
-        
-        hc_create(
-            name=f"{NODE}.{domain}.{VMTYPE}.{VMID}.{os.environ.get('HOSTNAME', 'unknown')}",
+            name=f"{node}.{domain}.{VMTYPE}.{VMID}.{os.environ.get('HOSTNAME', 'unknown')}",
             slug_prefix=HC_VM_SLUG_PREFIX,
             grace=3600,
             description=description,
@@ -573,86 +626,141 @@ def main() -> None:
         
         info(f"{PHASE} -- Ping {VMTYPE} start")
         hc_ping(HC_VM_SLUG_PREFIX, "start")
-        
-        info(f"{PHASE} -- Ping Host Log")
-        hc_ping(HC_HOST_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
     
-    elif PHASE in ["pre-stop", "pre-restart", "post-restart"]:
-        # Send a log ping to VM/container and host endpoints
-        info(f"{PHASE} -- Ping {VMTYPE} Log")
-        hc_ping(HC_VM_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
-        
+    def ping_host_log() -> None:
         info(f"{PHASE} -- Ping Host Log")
         hc_ping(HC_HOST_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
     
-    elif PHASE == "backup-end":
-        # Send a success ping to VM/container endpoint
-        # and a log ping to host endpoint
-        info(f"{PHASE} -- Ping {VMTYPE} Success")
-        hc_ping(HC_VM_SLUG_PREFIX, data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
-        
-        info(f"{PHASE} -- Ping Host Log")
-        hc_ping(HC_HOST_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
+    # The host log ping does not depend on the VM/container endpoint
+    from concurrent.futures import ThreadPoolExecutor
     
-    elif PHASE == "backup-abort":
-        # Send a fail ping to VM/container endpoint
-        # and a log ping to host endpoint
-        info(f"{PHASE} -- Ping {VMTYPE} fail")
-        hc_ping(HC_VM_SLUG_PREFIX, "fail", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
-        
-        info(f"{PHASE} -- Ping Host Log")
-        hc_ping(HC_HOST_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
-        
-        url = get_dashboard_url(HC_VM_SLUG_PREFIX, HC_RW_API_KEY, HC_BASE_DOMAIN)
-        with open(ERRLOG, "a") as f:
-            f.write(f"{TASK_ID} - {VMID} - Backup Abort - {url}\n")
-        print(f"{TASK_ID} - {VMID} - Backup Abort - {url}")
-    
-    elif PHASE == "log-end":
-        # Send a log ping to VM/container endpoint
-        # with log file content
-        info(f"LOGFILE: {LOGFILE}")
-        info(f"{PHASE} -- Ping {VMTYPE} Log")
-        
-        try:
-            # Filter log to exclude MESG and OKhttp lines
-            cmd = f"grep -v 'MESG' {LOGFILE} | grep -v 'OKhttp'"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            backup_log = result.stdout
-            
-            hc_ping(HC_VM_SLUG_PREFIX, "log", data=backup_log)
-        except Exception as e:
-            error("Read Log File", str(e))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(create_and_start), executor.submit(ping_host_log)]
+        for future in futures:
+            future.result()
+
+def guest_log() -> None:
+    """Send a log ping to VM/container and host endpoints."""
+    info(f"{PHASE} -- Ping {VMTYPE} Log")
+    hc_ping(HC_VM_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
     
-    elif PHASE == "job-end":
-        # Send a success or fail ping to host endpoint
-        if ERRLOG.exists():
-            with open(ERRLOG, "r") as f:
-                job_log = f.read()
-            
-            info(f"{PHASE} -- Ping Host Fail")
-            hc_ping(HC_HOST_SLUG_PREFIX, "fail", data=job_log)
-            ERRLOG.unlink()  # Delete error log file
-        else:
-            info(f"{PHASE} -- Ping Host Success")
-            hc_ping(HC_HOST_SLUG_PREFIX, data=TASK_ID)
-    
-    elif PHASE == "job-abort":
-        # Send a fail ping to host endpoint
-        info(f"{PHASE} -- Ping Host Fail")
-        with open(ERRLOG, "a") as f:
-            f.write(f"{TASK_ID} - Job Abort\n")
-        
-        with open(ERRLOG, "r") as f:
-            job_log = f.read()
+    info(f"{PHASE} -- Ping Host Log")
+    hc_ping(HC_HOST_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
+
+def backup_end() -> None:
+    """Send a success ping to the VM/container endpoint and log it on the host endpoint."""
+    info(f"{PHASE} -- Ping {VMTYPE} Success")
+    hc_ping(HC_VM_SLUG_PREFIX, data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
+    
+    info(f"{PHASE} -- Ping Host Log")
+    hc_ping(HC_HOST_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
+
+def backup_abort() -> None:
+    """Send a fail ping to the VM/container endpoint and log it on the host endpoint."""
+    info(f"{PHASE} -- Ping {VMTYPE} fail")
+    hc_ping(HC_VM_SLUG_PREFIX, "fail", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
+    
+    info(f"{PHASE} -- Ping Host Log")
+    hc_ping(HC_HOST_SLUG_PREFIX, "log", data=f"{PHASE}: {HC_VM_SLUG_PREFIX}")
+    
+    url = get_dashboard_url(HC_VM_SLUG_PREFIX, HC_RW_API_KEY, HC_BASE_DOMAIN)
+    append_errlog(f"{TASK_ID} - {VMID} - Backup Abort - {url}")
+    print(f"{TASK_ID} - {VMID} - Backup Abort - {url}")
+
+def log_end() -> None:
+    """Send the backup log file to the VM/container endpoint."""
+    info(f"LOGFILE: {LOGFILE}")
+    info(f"{PHASE} -- Ping {VMTYPE} Log")
+    
+    # Filter log to exclude MESG and OKhttp lines, keeping the last 100000 bytes
+    try:
+        with open(LOGFILE, "rb") as f:
+            backup_log = b"".join(l for l in f if b"MESG" not in l and b"OKhttp" not in l)
+    except OSError as e:
+        # A missing or unreadable log is sent as an empty log, not a job failure
+        info(f"Cannot read {LOGFILE}: {e}")
+        backup_log = b""
+    backup_log = backup_log[-100000:].decode("utf-8", "replace")
+    
+    hc_ping(HC_VM_SLUG_PREFIX, "log", data=backup_log)
+
+def job_end() -> None:
+    """Send a success or fail ping to the host endpoint."""
+    if os.path.exists(ERRLOG):
+        job_log = read_errlog()
         
+        info(f"{PHASE} -- Ping Host Fail")
         hc_ping(HC_HOST_SLUG_PREFIX, "fail", data=job_log)
-    
+        os.remove(ERRLOG)  # Delete error log file
     else:
-        # Unknown phase, send a fail ping to host endpoint
-        info(f"{PHASE} -- Ping Host Fail")
-        hc_ping(HC_HOST_SLUG_PREFIX, "fail", data=f"UNKNOWN: {PHASE}")
-        warn("Unknown Phase", PHASE)
+        info(f"{PHASE} -- Ping Host Success")
+        hc_ping(HC_HOST_SLUG_PREFIX, data=TASK_ID)
+
+def job_abort() -> None:
+    """Send a fail ping to the host endpoint."""
+    info(f"{PHASE} -- Ping Host Fail")
+    append_errlog(f"{TASK_ID} - Job Abort")
+    job_log = read_errlog()
+    
+    hc_ping(HC_HOST_SLUG_PREFIX, "fail", data=job_log)
+
+def unknown_phase() -> None:
+    """Send a fail ping to the host endpoint for an unknown phase."""
+    info(f"{PHASE} -- Ping Host Fail")
+    hc_ping(HC_HOST_SLUG_PREFIX, "fail", data=f"UNKNOWN: {PHASE}")
+    warn("Unknown Phase", PHASE)
+
+# Handlers for each backup phase
+PHASE_HANDLERS = {
+    "job-init": job_init,
+    "job-start": job_start,
+    "backup-start": backup_start,
+    "pre-stop": guest_log,
+    "pre-restart": guest_log,
+    "post-restart": guest_log,
+    "backup-end": backup_end,
+    "backup-abort": backup_abort,
+    "log-end": log_end,
+    "job-end": job_end,
+    "job-abort": job_abort,
+}
+
+# Exécuter les actions en fonction de la phase
+def main() -> None:
+    """Main function that executes actions based on the phase."""
+    global HC_BASE_DOMAIN, HC_PING_DOMAIN, HC_RW_API_KEY, HC_PING_KEY
+    global PHASE, MODE, VMID, HC_VM_SLUG_PREFIX, LOGFILE
+    
+    # Parse command line arguments
+    args = parse_args()
+    print(f"HOOK: {' '.join(sys.argv[1:])} -- {TASK_ID}")
+    
+    # Override environment variables with command line arguments if provided
+    if args.env_file and args.env_file != ENV_FILE and load_env_file(args.env_file):
+        HC_BASE_DOMAIN = os.environ.get("HC_BASE_DOMAIN", HC_BASE_DOMAIN)
+        HC_PING_DOMAIN = os.environ.get("HC_PING_DOMAIN", HC_PING_DOMAIN)
+        HC_RW_API_KEY = os.environ.get("HC_RW_API_KEY", HC_RW_API_KEY)
+        HC_PING_KEY = os.environ.get("HC_PING_KEY", HC_PING_KEY)
+    
+    HC_BASE_DOMAIN = args.hc_domain or HC_BASE_DOMAIN
+    HC_PING_DOMAIN = args.hc_ping_domain or HC_PING_DOMAIN
+    HC_RW_API_KEY = args.hc_rw_key or HC_RW_API_KEY
+    HC_PING_KEY = args.hc_ping_key or HC_PING_KEY
+    
+    PHASE = args.phase
+    if not PHASE:
+        error("Arguments", "Phase not provided")
+    
+    MODE = args.mode
+    VMID = args.vmid
+    HC_VM_SLUG_PREFIX = f"{VMID}-{VMTYPE}"
+    LOGFILE = get_logfile()
+    
+    # Display configuration parameters for debugging
+    info(f"Configuration: HC_BASE_DOMAIN={HC_BASE_DOMAIN}, HC_PING_DOMAIN={HC_PING_DOMAIN}")
+    info(f"Using API Key={HC_RW_API_KEY[:4]}***{HC_RW_API_KEY[-4:]} and Ping Key={HC_PING_KEY[:4]}***{HC_PING_KEY[-4:]}")
+    
+    PHASE_HANDLERS.get(PHASE, unknown_phase)()
 
 if __name__ == "__main__":
     # If no arguments are provided, display help